@@ -15,10 +15,17 @@ DEVICE = "cuda:0"
 # Embedding model settings
 EMBEDDING_MODEL = "paraphrase-multilingual-MiniLM-L12-v2"
 EMBEDDING_DIMENSION = 384
+EMBEDDING_BATCH_SIZE = 32  # Texts per encoder batch
+EMBEDDING_WORKERS = 0  # Encoder processes for bulk embedding (0 = automatic, one GPU worker on GPU machines)
+EMBEDDING_MAX_WORKERS = 4  # Cap for the automatic worker count; each worker loads its own model copy (~0.5-1 GB RAM)
 
 # Generator model settings
 GENERATOR_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
-MAX_NEW_TOKENS = 512
+MAX_NEW_TOKENS = 512  # Hard cap on generated tokens
+ANSWER_TOKEN_BUDGET = 192  # Default per-request token budget
+MAX_ANSWER_SENTENCES = 5  # Stop after this many sentences (answer, detail, closing)
+ANSWER_CLOSING_PHRASES = ["обращайтесь.", "обращайтесь!"]  # Stop once the closing phrase is written
+REPETITION_NGRAM = 8  # Stop when the last n tokens already occurred in the answer
 
 # FAISS index settings
 INDEX_TYPE = "IndexFlatIP"  # Inner product for cosine similarity
@@ -28,6 +35,17 @@ USE_GPU = False  # Set to True if using GPU
 LANGUAGE = "ru"
 CHUNK_SIZE = 512  # Characters per chunk
 CHUNK_OVERLAP = 50  # Character overlap between chunks
+QUERY_LEMMATIZE = False  # Lemmatize queries with spaCy (False keeps spaCy out of memory)
+SPACY_EXCLUDE = ["parser", "ner", "senter"]  # spaCy components not needed for lemmatization
+
+# Ingestion cleanup
+REMOVE_BOILERPLATE = True  # Drop text blocks repeated across pages (menus, footers, banners)
+BOILERPLATE_MIN_FRACTION = 0.5  # Share of pages a block must appear on to be boilerplate
+BOILERPLATE_MIN_PAGES = 3  # Minimum number of pages a block must appear on to be boilerplate
+BOILERPLATE_MIN_WORDS = 3  # Shorter blocks are never treated as boilerplate
+DEDUPLICATE_CHUNKS = True  # Drop near-duplicate chunks before embedding
+SIMHASH_MAX_DISTANCE = 3  # Max differing bits between 64-bit SimHashes of near-duplicates
+SHINGLE_SIZE = 3  # Words per shingle for SimHash
 
 # Retrieval settings
 TOP_K = 3  # Number of results to return
@@ -39,6 +57,14 @@ RAW_DATA_PATH = "data/raw"
 PROCESSED_DATA_PATH = "data/processed"
 INDEX_PATH = "data/index.faiss"
 DOCUMENTS_PATH = "data/processed/documents.json"
+EMBEDDINGS_PATH = "data/processed/embeddings.npy"
+
+# Corpora served by one node: name -> index and document store
+CORPORA = {
+    "default": {"index_path": INDEX_PATH, "documents_path": DOCUMENTS_PATH},
+}
+DEFAULT_CORPUS = "default"  # Corpus used when a chat has not selected one
+CORPUS_MEMORY_BUDGET_MB = 2048  # RAM for resident corpora, least recently used are evicted
 
 # Prompts
 SYSTEM_PROMPT = """
@@ -1,13 +1,130 @@
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import re
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteria, StoppingCriteriaList
 
-from config.config import GENERATOR_MODEL, SYSTEM_PROMPT, MAX_NEW_TOKENS, DEVICE
+from config.config import (
+    GENERATOR_MODEL, SYSTEM_PROMPT, MAX_NEW_TOKENS, DEVICE,
+    ANSWER_TOKEN_BUDGET, MAX_ANSWER_SENTENCES, ANSWER_CLOSING_PHRASES, REPETITION_NGRAM
+)
 
-model = AutoModelForCausalLM.from_pretrained(GENERATOR_MODEL)
-tokenizer = AutoTokenizer.from_pretrained(GENERATOR_MODEL)
+TERMINATORS = ".!?"
+ABBREVIATIONS = {
+    "см", "ср", "стр", "руб", "коп", "тыс", "млн", "млрд", "ул", "д", "г", "гг",
+    "т", "п", "пр", "др", "им", "кв", "мин", "сек", "напр", "etc", "e.g", "i.e"
+}
+LIST_MARKER_RE = re.compile(r'^\s*\d+$')  # "1." at the start of a line
 
-model.to(DEVICE)
+def is_sentence_end(text, pos):
+    """
+    Whether the terminator at text[pos] ends a sentence. Ellipses, abbreviations,
+    list markers and terminators not followed by an uppercase letter or the end
+    of text do not count.
+    """
+    if text[pos] not in TERMINATORS:
+        return False
+    if text[pos] == "." and ((pos > 0 and text[pos - 1] == ".") or text[pos + 1:pos + 2] == "."):
+        return False
+
+    following = text[pos + 1:].lstrip()
+    if following and not (following[0].isupper() or following[0] in '"«'):
+        return False
+
+    if text[pos] == ".":
+        line = text[text.rfind("\n", 0, pos) + 1:pos]
+        words = line.split()
+        # "см.", "т.е.", "ул." and similar abbreviations
+        word = words[-1].lower() if words else ""
+        if not words or LIST_MARKER_RE.match(line) or word in ABBREVIATIONS or "." in word:
+            return False
+    return True
+
+model = None
+tokenizer = None
+
+def load_model(model_name=GENERATOR_MODEL):
+    # Load the generator on first use so importing this module stays cheap;
+    # calling it early with another model name preloads that model instead
+    global model, tokenizer
+    if model is None:
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.to(DEVICE)
+    return model, tokenizer
+
+class AnswerStoppingCriteria(StoppingCriteria):
+    """
+    Stop generation once the answer is complete: a closing phrase was written,
+    the sentence limit was reached, or the model started repeating itself.
+    State is updated incrementally, so each step only looks at the newest token.
+    The reason for stopping is kept in stop_reason.
+    """
+
+    def __init__(self, tokenizer, prompt_length, max_sentences=MAX_ANSWER_SENTENCES,
+                 closing_phrases=ANSWER_CLOSING_PHRASES, ngram=REPETITION_NGRAM):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_sentences = max_sentences
+        self.closing_phrases = [phrase.lower() for phrase in closing_phrases]
+        self.ngram = ngram
+        self.stop_reason = None
+
+        self.tokens = []
+        self.seen_ngrams = set()
+        self.pending_tokens = []  # Tokens not yet decoded into complete characters
+        self.text = ""
+        self.scan_pos = 0  # Terminators before this position are already counted
+        self.sentences = 0
+
+    def add_token(self, token):
+        """Update repetition and sentence state with one token; returns the stop reason"""
+        self.tokens.append(token)
+        if len(self.tokens) >= self.ngram:
+            # The last n tokens already occurred earlier in the answer
+            tail = tuple(self.tokens[-self.ngram:])
+            if tail in self.seen_ngrams:
+                return "repetition"
+            self.seen_ngrams.add(tail)
+
+        self.pending_tokens.append(token)
+        piece = self.tokenizer.decode(self.pending_tokens, skip_special_tokens=True)
+        if piece.endswith("\ufffd"):
+            return None  # Partial multi-byte character, wait for the next token
+        self.pending_tokens = []
+        self.text += piece
+
+        if any(self.text.rstrip().lower().endswith(phrase) for phrase in self.closing_phrases):
+            return "closing"
+
+        # Count sentence ends once the text after them is known: a terminator
+        # at the very end may still be part of "7.5" or "bank.ru"
+        for pos in range(self.scan_pos, len(self.text) - 1):
+            if is_sentence_end(self.text, pos):
+                self.sentences += 1
+        self.scan_pos = max(self.scan_pos, len(self.text) - 1)
+
+        if self.sentences >= self.max_sentences:
+            return "sentences"
+        return None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        new_tokens = input_ids[0, self.prompt_length + len(self.tokens):].tolist()
+        for token in new_tokens:
+            if self.stop_reason is None:
+                self.stop_reason = self.add_token(token)
+        done = self.stop_reason is not None
+        return torch.full((input_ids.shape[0],), done, dtype=torch.bool, device=input_ids.device)
+
+def trim_to_sentence(text):
+    # Drop a trailing unfinished sentence left by the token budget or a repetition stop
+    text = text.strip()
+    for pos in range(len(text) - 1, -1, -1):
+        if is_sentence_end(text, pos):
+            return text[:pos + 1]
+    return text
+
+def generate_answer(query, context, max_new_tokens=ANSWER_TOKEN_BUDGET):
+    model, tokenizer = load_model()
 
-def generate_answer(query, context):
     # Combine the 
     combined_text = "\n\n".join(
         f"\n{source['text']}" for source in context
@@ -24,13 +141,22 @@ def generate_answer(query, context):
 
     # Tokenize and generate text
     input_ids = tokenizer.apply_chat_template(messages, truncation=True, add_generation_prompt=True, return_tensors="pt").to(DEVICE)
+    prompt_length = input_ids.shape[-1]
+    budget = min(max_new_tokens, MAX_NEW_TOKENS)
+    stopping = AnswerStoppingCriteria(tokenizer, prompt_length)
     output = model.generate(
         input_ids,
-        max_new_tokens=MAX_NEW_TOKENS
+        max_new_tokens=budget,
+        stopping_criteria=StoppingCriteriaList([stopping])
     )
 
-    # Decode and return result
-    decoded = tokenizer.decode(output[0], skip_special_tokens=True)
-    answer = decoded.split("assistant\n", 1)[-1]
+    # Decode only the newly generated tokens and return result
+    answer = tokenizer.decode(output[0, prompt_length:], skip_special_tokens=True).strip()
+
+    # Only a cut-off answer can end mid-sentence; a sentence-limit stop
+    # includes the first token of the next sentence
+    hit_budget = stopping.stop_reason is None and output.shape[-1] - prompt_length >= budget
+    if hit_budget or stopping.stop_reason in ("repetition", "sentences"):
+        answer = trim_to_sentence(answer)
     answer += f"\n\nЧитайте подробнее по ссылке: {context[0]['source_url']}"
     return answer
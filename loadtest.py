@@ -0,0 +1,380 @@
+"""
+Load-test harness for the Telegram bot.
+
+Runs the real Application and handlers from telegram_bot against a local stand-in
+for the Telegram Bot API, replays a mix of questions at a target arrival rate and
+reports throughput, end-to-end latency percentiles and event-loop lag.
+Runs fully offline: with fixed-latency stand-ins by default, or with small local
+models passed via --embedding-model/--generator-model.
+
+Replies are matched to questions first-in-first-out per chat, since the bot does
+not quote the message it answers. Handler errors are counted and complete the
+oldest pending question of their chat, so a failed update does not shift later
+latencies; with --concurrency > 1 replies within one chat may still be matched
+out of order.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from telegram_bot import build_application
+from config.config import DEFAULT_CORPUS
+
+# Corpus for runs with a small embedding model when no --documents are given
+SAMPLE_DOCUMENTS = [
+    {"text": "Мы предоставляем услуги кредитования, открытия вкладов и расчетно-кассового обслуживания.",
+     "metadata": {"source_url": "https://example.com/services", "title": "services"}},
+    {"text": "Связаться со службой поддержки можно по телефону или через чат на сайте круглосуточно.",
+     "metadata": {"source_url": "https://example.com/support", "title": "support"}},
+    {"text": "Обслуживание счета для малого бизнеса стоит 990 рублей в месяц, первый месяц бесплатно.",
+     "metadata": {"source_url": "https://example.com/pricing", "title": "pricing"}},
+]
+
+DEFAULT_QUESTIONS = [
+    "Какие услуги вы предоставляете?",
+    "Как связаться со службой поддержки?",
+    "Какие условия у продукта?",
+    "Сколько стоит обслуживание?",
+    "/help",
+    "/start",
+]
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "LoadTest", "username": "loadtest_bot"}
+
+
+class FakeTelegramAPI:
+    """In-memory state of the fake Bot API: pending updates and captured replies"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.updates: List[Dict[str, Any]] = []
+        self.next_update_id = 1
+        self.next_message_id = 1
+        # Send times of questions still waiting for a reply, per chat
+        self.pending = defaultdict(deque)
+        self.sent = 0
+        self.replies = 0
+        self.edits = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+
+    def _message(self, chat_id: int, text: str, sender: Dict[str, Any]) -> Dict[str, Any]:
+        message = {
+            "message_id": self.next_message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": sender,
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        self.next_message_id += 1
+        return message
+
+    def send_user_message(self, chat_id: int, text: str) -> None:
+        """Queue an incoming user message as an update"""
+        user = {"id": chat_id, "is_bot": False, "first_name": f"User{chat_id}"}
+        with self.condition:
+            self.updates.append({
+                "update_id": self.next_update_id,
+                "message": self._message(chat_id, text, user),
+            })
+            self.next_update_id += 1
+            self.pending[chat_id].append(time.perf_counter())
+            self.sent += 1
+            self.condition.notify_all()
+
+    def get_updates(self, offset: Optional[int], timeout: float) -> List[Dict[str, Any]]:
+        """Long-poll for updates, confirming those below offset"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            if offset is not None:
+                self.updates = [u for u in self.updates if u["update_id"] >= offset]
+            while not self.updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return list(self.updates)
+
+    def capture_reply(self, chat_id: int, text: str, edit: bool = False) -> Dict[str, Any]:
+        """Record a bot reply; the first reply to a question completes it"""
+        now = time.perf_counter()
+        with self.condition:
+            if edit:
+                self.edits += 1
+            else:
+                self.replies += 1
+                if self.pending[chat_id]:
+                    self.latencies.append(now - self.pending[chat_id].popleft())
+            return self._message(chat_id, text, BOT_USER)
+
+    def capture_error(self, chat_id: int) -> None:
+        """Record a handler error; it completes the oldest pending question of the chat"""
+        with self.condition:
+            self.errors += 1
+            if self.pending[chat_id]:
+                self.pending[chat_id].popleft()
+
+    @property
+    def outstanding(self) -> int:
+        with self.condition:
+            return sum(len(times) for times in self.pending.values())
+
+    def handle(self, method: str, params: Dict[str, Any]) -> Any:
+        """Dispatch a Bot API method call"""
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            return self.get_updates(params.get("offset"), float(params.get("timeout", 0)))
+        if method == "sendMessage":
+            return self.capture_reply(int(params["chat_id"]), str(params.get("text", "")))
+        if method == "editMessageText":
+            return self.capture_reply(int(params["chat_id"]), str(params.get("text", "")), edit=True)
+        # deleteWebhook, setMyCommands, etc.
+        return True
+
+
+def make_request_handler(api: FakeTelegramAPI):
+    """Build an HTTP handler class serving /bot<token>/<method> from api"""
+
+    class BotAPIRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.rstrip("/").rsplit("/", 1)[-1]
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8")
+            params = {}
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params = json.loads(body or "{}")
+            else:
+                # Form fields; non-string values are JSON-encoded by the client
+                for key, values in parse_qs(body).items():
+                    try:
+                        params[key] = json.loads(values[0])
+                    except ValueError:
+                        params[key] = values[0]
+
+            payload = json.dumps({"ok": True, "result": api.handle(method, params)}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return BotAPIRequestHandler
+
+
+class StandInRetriever:
+    """Offline stand-in for Retriever: fixed results after a blocking delay"""
+
+    def __init__(self, latency_ms: float = 20.0):
+        self.latency = latency_ms / 1000
+
+    def retrieve(self, query: str, **kwargs) -> List[Dict[str, Any]]:
+        time.sleep(self.latency)
+        return [{
+            "text": f"Справочная информация по запросу: {query}",
+            "source_url": "https://example.com/info",
+            "title": "info",
+            "score": 1.0,
+        }]
+
+
+def stand_in_generator(latency_ms: float = 200.0):
+    """Offline stand-in for generate_answer: a fixed answer after a blocking delay"""
+    def generate(query, context):
+        time.sleep(latency_ms / 1000)
+        return f"На сайте указано следующее: {context[0]['text']}\n\nЧитайте подробнее по ссылке: {context[0]['source_url']}"
+    return generate
+
+
+def replay_questions(api: FakeTelegramAPI, questions: List[str], rate: float,
+                     duration: float, num_chats: int, seed: int) -> None:
+    """Send questions as Poisson arrivals at the target rate for the given duration"""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    next_arrival = start
+    while True:
+        next_arrival += rng.expovariate(rate)
+        if next_arrival - start >= duration:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        api.send_user_message(1000 + rng.randrange(num_chats), rng.choice(questions))
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.05) -> None:
+    """Record how late the event loop wakes up from a fixed sleep"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+def format_percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+    return f"p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms, max {max(values) * 1000:.1f} ms"
+
+
+def build_retriever(args, corpus_dir: str):
+    """Stand-in retriever, or a real Retriever over the configured or a temporary corpus"""
+    if not (args.embedding_model or args.real_models):
+        return StandInRetriever(args.retrieve_ms)
+
+    from retriever.retriever import Retriever
+    from retriever.corpus import CorpusManager
+    from retriever.index import FAISSIndex
+
+    if not args.embedding_model:
+        retriever = Retriever(corpus_manager=CorpusManager.from_config())
+    else:
+        documents = SAMPLE_DOCUMENTS
+        if args.documents:
+            with open(args.documents, 'r', encoding='utf-8') as f:
+                documents = json.load(f)
+
+        # Index the documents with the small model as the default corpus
+        manager = CorpusManager()
+        retriever = Retriever(model_name=args.embedding_model, corpus_manager=manager)
+        embeddings = retriever.embedder.embed_text([doc['text'] for doc in documents])
+        index = FAISSIndex(dimension=embeddings.shape[1])
+        index.add_embeddings(embeddings)
+        index_path = f"{corpus_dir}/index.faiss"
+        documents_path = f"{corpus_dir}/documents.json"
+        index.save(index_path)
+        with open(documents_path, 'w', encoding='utf-8') as f:
+            json.dump(documents, f, ensure_ascii=False)
+        manager.register(DEFAULT_CORPUS, index_path, documents_path)
+
+    if args.score_threshold is not None:
+        retriever.retrieve = functools.partial(retriever.retrieve, threshold=args.score_threshold)
+    return retriever
+
+
+def build_answer_fn(args):
+    """Stand-in generator, or generate_answer with the configured or a small model"""
+    if not (args.generator_model or args.real_models):
+        return stand_in_generator(args.generate_ms)
+
+    from generator.generator import generate_answer, load_model
+    if args.generator_model:
+        load_model(args.generator_model)
+    return generate_answer
+
+
+def warm_up(retriever, answer_fn, questions: List[str]) -> None:
+    """Run one question through retrieval and generation"""
+    question = next((q for q in questions if not q.startswith("/")), DEFAULT_QUESTIONS[0])
+    results = retriever.retrieve(question, corpus=DEFAULT_CORPUS)
+    answer_fn(question, results or StandInRetriever(0).retrieve(question))
+
+
+async def run_load_test(args) -> None:
+    api = FakeTelegramAPI()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_request_handler(api))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    corpus_dir = tempfile.TemporaryDirectory()
+    retriever = build_retriever(args, corpus_dir.name)
+    answer_fn = build_answer_fn(args)
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions, 'r', encoding='utf-8') as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    # Pay model loading and first-call costs before anything is measured
+    warm_up(retriever, answer_fn, questions)
+
+    application = build_application(
+        retriever,
+        token="loadtest",
+        base_url=f"http://127.0.0.1:{server.server_port}/bot",
+        answer_fn=answer_fn,
+        concurrent_updates=args.concurrency if args.concurrency > 1 else False,
+    )
+
+    async def count_error(update, context) -> None:
+        if getattr(update, "effective_chat", None):
+            api.capture_error(update.effective_chat.id)
+
+    application.add_error_handler(count_error)
+
+    lag_samples = []
+    loop = asyncio.get_running_loop()
+    async with application:
+        await application.start()
+        await application.updater.start_polling(poll_interval=0, timeout=1)
+        monitor = asyncio.create_task(monitor_loop_lag(lag_samples))
+
+        start = time.perf_counter()
+        await loop.run_in_executor(
+            None, replay_questions, api, questions, args.rate,
+            args.duration, args.chats, args.seed
+        )
+
+        # Wait for replies to questions still in flight
+        drain_deadline = time.perf_counter() + args.drain_timeout
+        while api.outstanding and time.perf_counter() < drain_deadline:
+            await asyncio.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+        monitor.cancel()
+        await application.updater.stop()
+        await application.stop()
+
+    server.shutdown()
+    corpus_dir.cleanup()
+
+    print(f"Target rate:        {args.rate:.1f} msg/s over {args.duration:.0f}s, {args.chats} chats")
+    print(f"Sent / answered:    {api.sent} / {len(api.latencies)} ({api.outstanding} unanswered, {api.errors} errors, {api.edits} edits)")
+    print(f"Throughput:         {len(api.latencies) / elapsed:.2f} answers/s")
+    print(f"End-to-end latency: {format_percentiles(api.latencies)}")
+    print(f"Event-loop lag:     {format_percentiles(lag_samples)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the Telegram bot against a local fake Bot API")
+    parser.add_argument("--rate", type=float, default=5.0, help="Target arrival rate, messages per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to send messages for")
+    parser.add_argument("--chats", type=int, default=50, help="Number of distinct chats")
+    parser.add_argument("--questions", help="File with one question per line (repeat lines to weight the mix)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Updates processed concurrently by the bot")
+    parser.add_argument("--retrieve-ms", type=float, default=20.0, help="Stand-in retrieval latency")
+    parser.add_argument("--generate-ms", type=float, default=200.0, help="Stand-in generation latency")
+    parser.add_argument("--embedding-model",
+                        help="Small local sentence-transformers model; indexes --documents into a temporary corpus")
+    parser.add_argument("--generator-model", help="Small local causal LM used by generate_answer")
+    parser.add_argument("--documents", help="Chunks JSON to index with --embedding-model (default: built-in sample)")
+    parser.add_argument("--score-threshold", type=float,
+                        help="Retrieval score threshold (small models often need a lower one than the config)")
+    parser.add_argument("--real-models", action="store_true",
+                        help="Use the configured corpora and models (overridden by the model options above)")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="Seconds to wait for in-flight replies")
+    parser.add_argument("--port", type=int, default=0, help="Port for the fake Bot API (0 = any free port)")
+    parser.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args))
+
+if __name__ == "__main__":
+    main()
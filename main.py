@@ -5,23 +5,23 @@ import os
 import argparse
 
 from retriever.preprocessor import process_documents
-from retriever.embedder import embed_documents
+from retriever.embedder import bulk_embed_documents
 from retriever.index import create_and_save_index
 from retriever.retriever import Retriever
 from generator.generator import generate_answer
 from config.config import (
     RAW_DATA_PATH, PROCESSED_DATA_PATH, 
-    INDEX_PATH, DOCUMENTS_PATH,
-    MISS_MESSAGE, BYE_MESSAGE
+    INDEX_PATH, DOCUMENTS_PATH, EMBEDDINGS_PATH,
+    EMBEDDING_WORKERS, MISS_MESSAGE, BYE_MESSAGE
 )
 
-def prepare_data():
+def prepare_data(num_workers: int = EMBEDDING_WORKERS):
     """Process raw data into chunks and generate embeddings and index"""
     # Process documents
     _ = process_documents(RAW_DATA_PATH, DOCUMENTS_PATH)
     
     # Generate embeddings
-    _, embeddings = embed_documents(DOCUMENTS_PATH)
+    _, embeddings = bulk_embed_documents(DOCUMENTS_PATH, EMBEDDINGS_PATH, num_workers=num_workers)
     
     # Create index
     create_and_save_index(embeddings, INDEX_PATH)
@@ -54,6 +54,8 @@ def main():
     parser = argparse.ArgumentParser(description="RAG Chatbot Engine")
     parser.add_argument("--prepare", action="store_true", help="Prepare data (process, embed, index)")
     parser.add_argument("--query", action="store_true", help="Enter interactive query mode")
+    parser.add_argument("--workers", type=int, default=EMBEDDING_WORKERS,
+                        help="Encoder processes for --prepare (0 = automatic)")
     
     args = parser.parse_args()
     
@@ -64,7 +66,7 @@ def main():
     
     # Handle commands
     if args.prepare:
-        prepare_data()
+        prepare_data(num_workers=args.workers)
     
     # Only initialize retriever if needed for query mode
     if args.query:
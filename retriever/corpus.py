@@ -0,0 +1,179 @@
+"""
+Multi-corpus management for RAG Chatbot
+"""
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+from config.config import CORPORA, DEFAULT_CORPUS, CORPUS_MEMORY_BUDGET_MB
+from retriever.index import FAISSIndex
+
+def _object_size(obj: Any) -> int:
+    """Approximate memory taken by parsed JSON (dicts, lists, strings, numbers)"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_object_size(key) + _object_size(value) for key, value in obj.items())
+    elif isinstance(obj, list):
+        size += sum(_object_size(item) for item in obj)
+    return size
+
+class Corpus:
+    """A named FAISS index with its document store"""
+
+    def __init__(self, name: str, index_path: str, documents_path: str):
+        """Register corpus paths; data is loaded with load()"""
+        self.name = name
+        self.index_path = index_path
+        self.documents_path = documents_path
+        self.index: Optional[FAISSIndex] = None
+        self.documents: List[Dict[str, Any]] = []
+        self.size_bytes = 0
+        self.failed = False  # Set when loading failed; cleared by registering again
+
+    @property
+    def loaded(self) -> bool:
+        return self.index is not None
+
+    def load(self) -> None:
+        """
+        Load index and documents from disk and measure their resident size.
+        The FAISS index takes about its on-disk size; parsed documents are
+        measured, as dicts and strings take several times the JSON size.
+        """
+        index = FAISSIndex()
+        index.load(self.index_path)
+        with open(self.documents_path, 'r', encoding='utf-8') as f:
+            self.documents = json.load(f)
+        self.index = index
+        self.size_bytes = os.path.getsize(self.index_path) + _object_size(self.documents)
+
+    def unload(self) -> None:
+        """Release index and documents"""
+        self.index = None
+        self.documents = []
+        self.size_bytes = 0
+
+class CorpusManager:
+    """
+    Registry of named corpora loaded lazily on first query.
+    Resident corpora are kept under a memory budget with LRU eviction.
+    """
+
+    def __init__(self, memory_budget_mb: float = CORPUS_MEMORY_BUDGET_MB):
+        """Initialize an empty registry with the given memory budget"""
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.corpora: Dict[str, Corpus] = {}
+        self._resident: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self._warned_fanouts = set()  # Over-budget fan-outs already reported
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, corpora: Dict[str, Dict[str, str]] = CORPORA,
+                    memory_budget_mb: float = CORPUS_MEMORY_BUDGET_MB,
+                    default_corpus: str = DEFAULT_CORPUS) -> "CorpusManager":
+        """Create a manager with all corpora from the config registered"""
+        if default_corpus not in corpora:
+            raise ValueError(f"Default corpus '{default_corpus}' is not in CORPORA: {', '.join(corpora)}")
+        manager = cls(memory_budget_mb)
+        for name, paths in corpora.items():
+            manager.register(name, paths["index_path"], paths["documents_path"])
+        return manager
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.corpora)
+
+    @property
+    def resident(self) -> List[str]:
+        """Names of loaded corpora, least recently used first"""
+        return list(self._resident)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(self._resident.values())
+
+    def register(self, name: str, index_path: str, documents_path: str) -> None:
+        """Register a corpus without loading it"""
+        with self._lock:
+            if name in self._resident:
+                self._evict(name)
+            self.corpora[name] = Corpus(name, index_path, documents_path)
+
+    def get(self, name: str) -> Optional[Tuple[FAISSIndex, List[Dict[str, Any]]]]:
+        """
+        Return index and documents of a corpus, loading it and evicting others if needed.
+        Returns None if the corpus could not be loaded.
+        The returned objects stay valid even if the corpus is evicted later.
+        """
+        return self.get_many([name]).get(name)
+
+    def get_many(self, names: List[str]) -> Dict[str, Tuple[FAISSIndex, List[Dict[str, Any]]]]:
+        """
+        Return index and documents of several corpora for one request.
+        Requested corpora are never evicted by each other while loading; corpora
+        that fail to load are skipped. If the requested corpora together exceed
+        the memory budget, they are trimmed back to it afterwards, so such a
+        fan-out reloads from disk on every request.
+        """
+        with self._lock:
+            unknown = [name for name in names if name not in self.corpora]
+            if unknown:
+                raise KeyError(f"Unknown corpus: {', '.join(unknown)}")
+
+            requested = set(names)
+            loaded = {}
+            for name in names:
+                if self._load(name, keep=requested):
+                    corpus = self.corpora[name]
+                    loaded[name] = (corpus.index, corpus.documents)
+
+            requested_bytes = sum(self._resident.get(name, 0) for name in loaded)
+            fanout = frozenset(loaded)
+            if requested_bytes > self.memory_budget and len(loaded) > 1 \
+                    and fanout not in self._warned_fanouts:
+                self._warned_fanouts.add(fanout)
+                print(
+                    f"Corpora {', '.join(loaded)} need {requested_bytes / 2**20:.1f} MB, "
+                    f"over the {self.memory_budget / 2**20:.1f} MB budget; they are reloaded on every query"
+                )
+
+            # Back under budget for the next request, always keeping the last corpus loaded
+            self._evict_over_budget(keep={names[-1]})
+
+            return loaded
+
+    def _load(self, name: str, keep: set) -> bool:
+        """Make a corpus resident; returns False if it could not be loaded"""
+        corpus = self.corpora[name]
+        if name in self._resident:
+            self._resident.move_to_end(name)
+            return True
+        if corpus.failed:
+            return False
+
+        try:
+            corpus.load()
+        except (OSError, ValueError, RuntimeError) as e:
+            corpus.unload()
+            corpus.failed = True
+            print(f"Error loading corpus {name}: {e} (skipped until registered again)")
+            return False
+
+        self._resident[name] = corpus.size_bytes
+        self._evict_over_budget(keep)
+        return True
+
+    def _evict_over_budget(self, keep: set) -> None:
+        # Evict least recently used corpora not in keep until under budget
+        for name in list(self._resident):
+            if self.resident_bytes <= self.memory_budget:
+                break
+            if name not in keep:
+                self._evict(name)
+
+    def _evict(self, name: str) -> None:
+        self._resident.pop(name)
+        self.corpora[name].unload()
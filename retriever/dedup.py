@@ -0,0 +1,131 @@
+"""
+Boilerplate and near-duplicate elimination for RAG Chatbot ingestion
+"""
+import re
+import hashlib
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+
+from config.config import (
+    BOILERPLATE_MIN_FRACTION, BOILERPLATE_MIN_PAGES, BOILERPLATE_MIN_WORDS,
+    SIMHASH_MAX_DISTANCE, SHINGLE_SIZE
+)
+
+WORD_RE = re.compile(r'\w+')
+
+def _normalize_block(block: str) -> str:
+    """Normalize a text block for comparison across pages"""
+    return " ".join(block.lower().split())
+
+def _text_bytes(items: List[Dict[str, Any]]) -> int:
+    return sum(len(item.get('text', '').encode('utf-8')) for item in items)
+
+def remove_boilerplate(documents: List[Dict[str, Any]],
+                       min_fraction: float = BOILERPLATE_MIN_FRACTION,
+                       min_pages: int = BOILERPLATE_MIN_PAGES,
+                       min_words: int = BOILERPLATE_MIN_WORDS) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Remove text blocks (lines) repeated across many pages, such as navigation
+    menus, footers and cookie banners.
+    A block is boilerplate if it appears on at least min_pages pages and on at
+    least min_fraction of all pages. Blocks shorter than min_words words are
+    never boilerplate, so common short fragments ("руб.", prices) are kept.
+    Returns cleaned copies of the documents and statistics.
+    """
+    page_blocks = [
+        [block for block in doc.get('text', '').split("\n") if block.strip()]
+        for doc in documents
+    ]
+
+    # Count on how many pages each block appears
+    page_counts = Counter()
+    for blocks in page_blocks:
+        page_counts.update({_normalize_block(block) for block in blocks})
+
+    cutoff = max(min_pages, min_fraction * len(documents))
+    boilerplate = {
+        block for block, count in page_counts.items()
+        if count >= cutoff and len(WORD_RE.findall(block)) >= min_words
+    }
+
+    cleaned = []
+    removed_blocks = 0
+    removed_bytes = 0
+    for doc, blocks in zip(documents, page_blocks):
+        kept = []
+        for block in blocks:
+            if _normalize_block(block) in boilerplate:
+                removed_blocks += 1
+                removed_bytes += len(block.encode('utf-8')) + 1  # Block and its line break
+            else:
+                kept.append(block)
+        cleaned.append({**doc, "text": "\n".join(kept)})
+
+    bytes_before = _text_bytes(documents)
+    stats = {
+        "boilerplate_blocks": len(boilerplate),
+        "removed_blocks": removed_blocks,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_before - removed_bytes,
+    }
+    return cleaned, stats
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE) -> int:
+    """64-bit SimHash of the word shingles of a text"""
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return 0
+
+    shingles = {
+        " ".join(words[i:i + shingle_size])
+        for i in range(max(1, len(words) - shingle_size + 1))
+    }
+    digests = b"".join(hashlib.blake2b(s.encode('utf-8'), digest_size=8).digest() for s in shingles)
+    hashes = np.frombuffer(digests, dtype=np.uint8).reshape(len(shingles), 8)
+
+    # Majority vote per bit across all shingle hashes
+    bits = np.unpackbits(hashes, axis=1).astype(np.int32)
+    votes = (2 * bits - 1).sum(axis=0)
+    return int.from_bytes(np.packbits(votes > 0).tobytes(), 'big')
+
+def deduplicate_chunks(chunks: List[Dict[str, Any]],
+                       max_distance: int = SIMHASH_MAX_DISTANCE,
+                       shingle_size: int = SHINGLE_SIZE) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Drop chunks whose SimHash differs from an earlier chunk in at most
+    max_distance bits. The first occurrence is kept.
+    Returns kept chunks and statistics.
+    """
+    # Split the 64 bits into max_distance + 1 bands: near-duplicates
+    # are guaranteed to match exactly on at least one band
+    num_bands = max_distance + 1
+    band_bits = 64 // num_bands
+    bands = [
+        (i * band_bits, 64 if i == num_bands - 1 else (i + 1) * band_bits)
+        for i in range(num_bands)
+    ]
+    tables = [{} for _ in bands]
+
+    kept = []
+    kept_hashes = []
+    for chunk in chunks:
+        fingerprint = simhash(chunk['text'], shingle_size)
+        keys = [(fingerprint >> start) & ((1 << (end - start)) - 1) for start, end in bands]
+
+        candidates = {i for table, key in zip(tables, keys) for i in table.get(key, [])}
+        if any(bin(fingerprint ^ kept_hashes[i]).count("1") <= max_distance for i in candidates):
+            continue
+
+        for table, key in zip(tables, keys):
+            table.setdefault(key, []).append(len(kept))
+        kept.append(chunk)
+        kept_hashes.append(fingerprint)
+
+    stats = {
+        "chunks_before": len(chunks),
+        "chunks_after": len(kept),
+        "bytes_before": _text_bytes(chunks),
+        "bytes_after": _text_bytes(kept),
+    }
+    return kept, stats
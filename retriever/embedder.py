@@ -3,19 +3,23 @@ Embedding generation for RAG Chatbot
 """
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Union
 import os
 import json
+import time
+import multiprocessing as mp
 import torch
+from tqdm import tqdm
 
-from config.config import EMBEDDING_MODEL
+from config.config import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS, EMBEDDING_MAX_WORKERS
 
 class Embedder:
     """Generate embeddings for text using sentence-transformers"""
     
-    def __init__(self, model_name: str = EMBEDDING_MODEL):
-        """Initialize the embedder with the specified model"""
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = EMBEDDING_MODEL, device: Optional[str] = None):
+        """Initialize the embedder with the specified model (on GPU if available unless device is given)"""
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.model = SentenceTransformer(model_name, device=self.device)
         self.model_name = model_name
     
     def embed_text(self, text: Union[str, List[str]], 
@@ -29,23 +33,60 @@ class Embedder:
         if isinstance(text, str):
             text = [text]
         
-        # Check available device
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        
         embeddings = self.model.encode(
             text, 
             batch_size=batch_size,
             show_progress_bar=show_progress,
-            device=device,
+            device=self.device,
             convert_to_numpy=True
         )
         
         return embeddings
 
-def embed_documents(documents_path: str, embeddings_output_path: Optional[str] = None) -> tuple:
+
+# Per-process embedder used by bulk embedding workers
+_worker_embedder = None
+
+def _init_worker(model_name: str, num_threads: int, device: str) -> None:
+    """Load the embedding model once in each worker process"""
+    global _worker_embedder
+    torch.set_num_threads(num_threads)
+    _worker_embedder = Embedder(model_name, device=device)
+
+def _worker_token_lengths(texts: List[str]) -> List[int]:
+    """Count tokens per text (capped at the model's max sequence length)"""
+    max_length = _worker_embedder.model.max_seq_length
+    encoded = _worker_embedder.model.tokenizer(
+        texts, truncation=True, max_length=max_length
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+def _worker_encode(batch: Tuple[np.ndarray, List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Encode one batch and return it together with its original positions"""
+    indices, texts = batch
+    embeddings = _worker_embedder.embed_text(texts, batch_size=len(texts))
+    return indices, embeddings
+
+def _length_buckets(lengths: List[int], batch_size: int) -> List[np.ndarray]:
+    """
+    Group text positions into batches of similar token length.
+    Longest batches come first so the slowest work is scheduled early.
+    """
+    order = np.argsort(np.asarray(lengths), kind="stable")
+    buckets = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    return buckets[::-1]
+
+def bulk_embed_documents(documents_path: str, embeddings_output_path: str,
+                         num_workers: int = EMBEDDING_WORKERS,
+                         batch_size: int = EMBEDDING_BATCH_SIZE,
+                         model_name: str = EMBEDDING_MODEL) -> tuple:
     """
-    Generate embeddings for all documents and return texts and embeddings.
-    Also saves embeddings to file if output path is provided.
+    Generate embeddings for all documents using a pool of encoder processes.
+    Texts are sorted into length buckets to minimize padding, batches are
+    encoded in parallel and written in original order to a memory-mapped .npy file.
+    Several workers always run on CPU; a single worker uses the GPU if
+    available, which is also the default on GPU machines.
+    Returns texts and the (memory-mapped) embeddings.
     """
     # Load documents
     with open(documents_path, 'r', encoding='utf-8') as f:
@@ -54,13 +95,61 @@ def embed_documents(documents_path: str, embeddings_output_path: Optional[str] =
     # Extract texts
     texts = [doc['text'] for doc in documents]
     
-    # Create embedder and generate embeddings
-    embedder = Embedder()
-    embeddings = embedder.embed_text(texts, show_progress=True)
+    os.makedirs(os.path.dirname(embeddings_output_path) or ".", exist_ok=True)
+    
+    # CPUs this process may use (respects container/cgroup CPU affinity)
+    cpu_count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    if not num_workers:
+        # Each worker holds its own model copy, so the default is capped;
+        # remaining cores become intra-op threads of each worker
+        num_workers = 1 if torch.cuda.is_available() else min(cpu_count, EMBEDDING_MAX_WORKERS)
+    num_threads = max(1, cpu_count // num_workers)
+    
+    # One model copy per worker: never put more than one of them on the GPU
+    device = None if num_workers == 1 else 'cpu'
+    
+    start_time = time.perf_counter()
+    embeddings = None
+    
+    # Spawn keeps torch state from being forked into workers
+    context = mp.get_context("spawn")
+    with context.Pool(num_workers, initializer=_init_worker,
+                      initargs=(model_name, num_threads, device)) as pool:
+        # Count tokens in parallel to sort texts into length buckets
+        slice_size = max(1, len(texts) // num_workers + 1)
+        slices = [texts[i:i + slice_size] for i in range(0, len(texts), slice_size)]
+        lengths = [n for part in pool.map(_worker_token_lengths, slices) for n in part]
+        
+        batches = [
+            (indices, [texts[i] for i in indices])
+            for indices in _length_buckets(lengths, batch_size)
+        ]
+        
+        encode_start = time.perf_counter()
+        with tqdm(total=len(texts), unit="chunk") as progress:
+            for indices, batch_embeddings in pool.imap_unordered(_worker_encode, batches):
+                # Open output lazily, once the embedding dimension is known
+                if embeddings is None:
+                    embeddings = np.lib.format.open_memmap(
+                        embeddings_output_path, mode='w+', dtype=np.float32,
+                        shape=(len(texts), batch_embeddings.shape[1])
+                    )
+                embeddings[indices] = batch_embeddings
+                progress.update(len(indices))
+        encode_time = time.perf_counter() - encode_start
+    
+    if embeddings is None:
+        # No documents to embed
+        return texts, np.empty((0, 0), dtype=np.float32)
+    
+    embeddings.flush()
+    del embeddings
     
-    # Save embeddings if output path is provided
-    if embeddings_output_path:
-        os.makedirs(os.path.dirname(embeddings_output_path), exist_ok=True)
-        np.save(embeddings_output_path, embeddings)
+    total_time = time.perf_counter() - start_time
+    print(
+        f"Embedded {len(texts)} chunks with {num_workers} workers: "
+        f"{len(texts) / max(encode_time, 1e-9):.1f} chunks/s encoding, "
+        f"{len(texts) / max(total_time, 1e-9):.1f} chunks/s overall ({total_time:.1f}s)"
+    )
     
-    return texts, embeddings
+    return texts, np.load(embeddings_output_path, mmap_mode='r')
@@ -2,21 +2,41 @@
 Text preprocessing utilities for the RAG Chatbot
 """
 import re
-import spacy
 from typing import List, Dict, Any
 import json
 import os
 from tqdm import tqdm
 
-from config.config import LANGUAGE, CHUNK_SIZE, CHUNK_OVERLAP
+from config.config import (
+    LANGUAGE, CHUNK_SIZE, CHUNK_OVERLAP,
+    QUERY_LEMMATIZE, SPACY_EXCLUDE,
+    REMOVE_BOILERPLATE, DEDUPLICATE_CHUNKS
+)
+from retriever.dedup import remove_boilerplate, deduplicate_chunks
+
+WHITESPACE_RE = re.compile(r'\s+')
+QUOTES_RE = re.compile(r'[«»„""]')
 
 class TextPreprocessor:
     """Text preprocessing class for cleaning and tokenizing text"""
     
-    def __init__(self, lang: str = LANGUAGE):
-        """Initialize the preprocessor with language model"""
+    def __init__(self, lang: str = LANGUAGE, lemmatize: bool = QUERY_LEMMATIZE):
+        """
+        Initialize the preprocessor.
+        The spaCy model is only loaded on first use, so it never takes
+        memory when lemmatization is disabled.
+        """
         self.lang = lang
-        self.nlp = spacy.load(f"{lang}_core_news_md")
+        self.lemmatize = lemmatize
+        self._nlp = None
+    
+    @property
+    def nlp(self):
+        """spaCy pipeline without the components we don't use (loaded lazily)"""
+        if self._nlp is None:
+            import spacy
+            self._nlp = spacy.load(f"{self.lang}_core_news_md", exclude=SPACY_EXCLUDE)
+        return self._nlp
     
     def clean_text(self, text: str) -> str:
         """Clean text by removing extra whitespace and normalizing"""
@@ -24,25 +44,28 @@ class TextPreprocessor:
             return ""
         
         # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_RE.sub(' ', text)
         
         # Normalize punctuation
-        text = re.sub(r'[«»„""]', '"', text)
+        text = QUOTES_RE.sub('"', text)
         
         # Trim whitespace
         text = text.strip()
         
         return text
     
+    def lemmatize_text(self, text: str) -> str:
+        """Replace every token with its lemma, keeping the original spacing"""
+        doc = self.nlp(text)
+        return "".join(token.lemma_ + token.whitespace_ for token in doc)
+    
     def process(self, text: str) -> str:
-        """Process text through the full preprocessing pipeline"""
+        """Normalize a query: clean it and, if enabled, lemmatize it"""
         # Clean the text first
         clean_text = self.clean_text(text)
         
-        # Process with spaCy
-        doc = self.nlp(clean_text)
-        
-        # Additional processing can be added here
+        if self.lemmatize and clean_text:
+            return self.lemmatize_text(clean_text)
         
         return clean_text
     
@@ -98,18 +121,22 @@ class TextPreprocessor:
         return chunks
 
 
-def process_documents(input_path: str, output_path: str) -> List[Dict[str, Any]]:
+def process_documents(input_path: str, output_path: str,
+                      remove_repeated_blocks: bool = REMOVE_BOILERPLATE,
+                      deduplicate: bool = DEDUPLICATE_CHUNKS) -> List[Dict[str, Any]]:
     """
     Process all documents from the input directory and save chunks to output file.
     Expected input format: JSON files with documents containing text and metadata.
+    Boilerplate blocks repeated across pages and near-duplicate chunks are
+    removed before saving, and the savings are reported.
     """
     preprocessor = TextPreprocessor()
-    all_chunks = []
+    pages = []
     
     # Create output directory if it doesn't exist
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    # Process all files in the input directory
+    # Load all pages first, boilerplate is detected across the whole site
     for filename in tqdm(os.listdir(input_path)):
         if filename.endswith('.json'):
             file_path = os.path.join(input_path, filename)
@@ -134,14 +161,36 @@ def process_documents(input_path: str, output_path: str) -> List[Dict[str, Any]]
                 if 'metadata' in doc and isinstance(doc['metadata'], dict):
                     metadata.update(doc['metadata'])
                 
-                # Chunk the document
-                chunks = preprocessor.chunk_text(doc['text'], metadata)
-                
-                # Add document ID to each chunk
-                for i, chunk in enumerate(chunks):
-                    chunk["id"] = f"{os.path.splitext(filename)[0]}_{i}"
-                
-                all_chunks.extend(chunks)
+                pages.append({"text": doc['text'], "metadata": metadata, "filename": filename})
+    
+    if remove_repeated_blocks:
+        pages, stats = remove_boilerplate(pages)
+        print(
+            f"Boilerplate: removed {stats['removed_blocks']} blocks "
+            f"({stats['boilerplate_blocks']} distinct), "
+            f"{stats['bytes_before'] - stats['bytes_after']} of {stats['bytes_before']} bytes saved"
+        )
+    
+    all_chunks = []
+    for page in pages:
+        if not page['text'].strip():
+            continue
+        
+        # Chunk the document
+        chunks = preprocessor.chunk_text(page['text'], page['metadata'])
+        
+        # Add document ID to each chunk
+        for i, chunk in enumerate(chunks):
+            chunk["id"] = f"{os.path.splitext(page['filename'])[0]}_{i}"
+        
+        all_chunks.extend(chunks)
+    
+    if deduplicate:
+        all_chunks, stats = deduplicate_chunks(all_chunks)
+        print(
+            f"Near-duplicates: kept {stats['chunks_after']} of {stats['chunks_before']} chunks, "
+            f"{stats['bytes_before'] - stats['bytes_after']} of {stats['bytes_before']} bytes saved"
+        )
     
     # Save all chunks to the output file
     with open(output_path, 'w', encoding='utf-8') as f:
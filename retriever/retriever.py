@@ -3,7 +3,8 @@ Main retrieval class for RAG Chatbot
 """
 import os
 import json
-from typing import List, Dict, Any, Optional
+import numpy as np
+from typing import List, Dict, Any, Optional, Union
 
 from config.config import (
     EMBEDDING_MODEL, TOP_K, SCORE_THRESHOLD
@@ -11,6 +12,7 @@ from config.config import (
 from retriever.preprocessor import TextPreprocessor
 from retriever.embedder import Embedder
 from retriever.index import FAISSIndex
+from retriever.corpus import CorpusManager
 
 class Retriever:
     """Main retrieval class that combines preprocessing, embedding, and indexing"""
@@ -18,8 +20,12 @@ class Retriever:
     def __init__(self, 
                 model_name: str = EMBEDDING_MODEL,
                 index_path: Optional[str] = None,
-                documents_path: Optional[str] = None):
-        """Initialize the retriever with model, index, and documents"""
+                documents_path: Optional[str] = None,
+                corpus_manager: Optional[CorpusManager] = None):
+        """
+        Initialize the retriever with model, index, and documents.
+        With a corpus manager, queries can also be routed to named corpora.
+        """
         # Initialize preprocessor
         self.preprocessor = TextPreprocessor()
         
@@ -33,6 +39,9 @@ class Retriever:
         if index_path and os.path.exists(index_path):
             self.index.load(index_path)
         
+        # Named corpora, loaded on demand
+        self.corpus_manager = corpus_manager
+        
         # Load documents
         self.documents = []
         if documents_path and os.path.exists(documents_path):
@@ -68,9 +77,12 @@ class Retriever:
             json.dump(self.documents, f, ensure_ascii=False, indent=2)
     
     def search(self, query: str, top_k: int = TOP_K, 
-              threshold: float = SCORE_THRESHOLD) -> List[Dict[str, Any]]:
+              threshold: float = SCORE_THRESHOLD,
+              corpus: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
         """
         Search for documents relevant to the query
+        Searches the retriever's own index, or the given corpus name(s) of the
+        corpus manager, merging results across corpora into a single top-k
         Returns list of results with text, metadata, and relevance score
         """
         # Preprocess query
@@ -79,8 +91,30 @@ class Retriever:
         # Generate query embedding
         query_embedding = self.embedder.embed_text(processed_query)
         
+        if corpus is None:
+            return self._search_index(query_embedding, self.index, self.documents, top_k, threshold)
+        
+        if self.corpus_manager is None:
+            raise ValueError("Searching a named corpus requires a corpus manager")
+        
+        # Fan out across the requested corpora and merge top-k
+        names = [corpus] if isinstance(corpus, str) else corpus
+        results = []
+        for name, (index, documents) in self.corpus_manager.get_many(names).items():
+            for result in self._search_index(query_embedding, index, documents, top_k, threshold):
+                result["corpus"] = name
+                results.append(result)
+        
+        results.sort(key=lambda x: x["score"], reverse=True)
+        
+        return results[:top_k]
+    
+    def _search_index(self, query_embedding: np.ndarray, index: FAISSIndex,
+                      documents: List[Dict[str, Any]], top_k: int,
+                      threshold: float) -> List[Dict[str, Any]]:
+        """Search a single index and format results from its documents"""
         # Search in index
-        distances, indices = self.index.search(query_embedding, top_k)
+        distances, indices = index.search(query_embedding, top_k)
         
         # Normalize scores (FAISS returns IP similarity, higher is better)
         # Convert to 0-1 range for easier interpretation
@@ -89,7 +123,7 @@ class Retriever:
         # Format results
         results = []
         for i, doc_idx in enumerate(indices[0]):  # Get first row of indices
-            if doc_idx == -1 or doc_idx >= len(self.documents):
+            if doc_idx == -1 or doc_idx >= len(documents):
                 continue  # Invalid index
             
             score = float(scores[i])
@@ -98,7 +132,7 @@ class Retriever:
             if score < threshold:
                 continue
             
-            document = self.documents[doc_idx]
+            document = documents[doc_idx]
             results.append({
                 "text": document["text"],
                 "metadata": document.get("metadata", {}),
@@ -121,16 +155,18 @@ class Retriever:
     
     def retrieve(self, query: str, top_k: int = TOP_K, 
                 threshold: float = SCORE_THRESHOLD,
-                use_reranking: bool = False) -> List[Dict[str, Any]]:
+                use_reranking: bool = False,
+                corpus: Optional[Union[str, List[str]]] = None) -> List[Dict[str, Any]]:
         """
         Main retrieval method that handles the full pipeline:
         - Query processing
-        - Retrieval
+        - Retrieval (own index, or one or several named corpora)
         - Optional reranking
         - Formatting results with source links
         """
         # Get raw search results
-        results = self.search(query, top_k=top_k*2 if use_reranking else top_k, threshold=threshold)
+        results = self.search(query, top_k=top_k*2 if use_reranking else top_k,
+                              threshold=threshold, corpus=corpus)
         
         # Apply reranking if specified
         if use_reranking and len(results) > 0:
@@ -146,7 +182,8 @@ class Retriever:
                 "text": result["text"],
                 "source_url": source_url,
                 "title": result.get("metadata", {}).get("title", "info"),
-                "score": result["score"]
+                "score": result["score"],
+                "corpus": result.get("corpus")
             })
         
         return formatted_results
@@ -10,6 +10,15 @@ from config.config import RAW_DATA_PATH, TARGET_URL, BLACKLIST
 MAX_CRAWL = 100
 REQUEST_DELAY = 1
 
+SKIP_TAGS = ["nav", "script", "style", "noscript", "template"]
+PAGE_CHROME_TAGS = ["header", "footer"]  # Dropped only outside article/main
+CONTENT_TAGS = ["article", "main"]
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "main", "aside", "li", "ul", "ol",
+    "h1", "h2", "h3", "h4", "h5", "h6", "table", "tr", "td", "th",
+    "dl", "dt", "dd", "blockquote", "pre", "form", "figcaption"
+]
+
 urls_to_visit = [TARGET_URL]
 visited_urls = set()
 scraped_data = []
@@ -20,6 +29,28 @@ def is_blacklisted(url: str) -> bool:
 def clean_text(text: str) -> str:
     return " ".join(text.split())
 
+def extract_page_text(soup: BeautifulSoup) -> str:
+    """
+    Extract page text with one line per block-level element, so inline markup
+    does not split sentences and boilerplate can be detected across pages.
+    Navigation and script elements, and page-level header and footer, are dropped;
+    header/footer inside article or main is content (title, lead, source line).
+    Modifies soup in place.
+    """
+    for tag in soup.find_all(SKIP_TAGS):
+        tag.decompose()
+    for tag in soup.find_all(PAGE_CHROME_TAGS):
+        if tag.find_parent(CONTENT_TAGS) is None:
+            tag.decompose()
+    for tag in soup.find_all("br"):
+        tag.replace_with("\n")
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_before("\n")
+        tag.insert_after("\n")
+
+    lines = (clean_text(line) for line in soup.get_text().split("\n"))
+    return "\n".join(line for line in lines if line)
+
 def get_title_from_url(url: str) -> str:
     path = urlparse(url).path.strip("/")
     if not path:
@@ -51,7 +82,10 @@ def crawl_site():
 
         visited_urls.add(current_url)
         soup = BeautifulSoup(response.text, "html.parser")
-        page_text = clean_text(soup.get_text(separator=" ", strip=True))
+
+        # Collect links before text extraction removes navigation from the tree
+        hrefs = [link["href"] for link in soup.find_all("a", href=True)]
+        page_text = extract_page_text(soup)
 
         scraped_data.append({
             "title": get_title_from_url(current_url),
@@ -59,8 +93,7 @@ def crawl_site():
             "text": page_text
         })
 
-        for link in soup.find_all("a", href=True):
-            href = link["href"]
+        for href in hrefs:
             absolute_url = urljoin(current_url, href)
             if is_same_domain(absolute_url):
                 absolute_url = absolute_url.split("#")[0]
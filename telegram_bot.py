@@ -2,9 +2,10 @@ from telegram import Update, ForceReply
 from telegram.ext import Application, CommandHandler, MessageHandler, ContextTypes, filters
 
 from retriever.retriever import Retriever
+from retriever.corpus import CorpusManager
 from generator.generator import generate_answer
 from config.config import (
-    INDEX_PATH, DOCUMENTS_PATH, 
+    DEFAULT_CORPUS,
     HELP_MESSAGE, MISS_MESSAGE,
     TELEGRAM_TOKEN
 )
@@ -22,32 +23,65 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     )
     await update.message.reply_text(message)
 
+async def corpus_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    # /corpus name[,name...] routes this chat's questions; "all" fans out to every corpus
+    available = context.application.bot_data["retriever"].corpus_manager.names
+    if not context.args:
+        current = context.chat_data.get("corpus", DEFAULT_CORPUS)
+        current = current if isinstance(current, str) else ", ".join(current)
+        await update.message.reply_text(f"Текущий раздел: {current}. Доступные разделы: {', '.join(available)}")
+        return
+
+    argument = "".join(context.args)
+    names = available if argument == "all" else [name for name in argument.split(",") if name]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        await update.message.reply_text(f"Неизвестный раздел: {', '.join(unknown)}. Доступные разделы: {', '.join(available)}")
+        return
+
+    context.chat_data["corpus"] = names[0] if len(names) == 1 else names
+    await update.message.reply_text(f"Выбран раздел: {', '.join(names)}")
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.message.text.strip()
     retriever = context.application.bot_data["retriever"]
-    results = retriever.retrieve(query)
+    results = retriever.retrieve(query, corpus=context.chat_data.get("corpus", DEFAULT_CORPUS))
 
     if not results:
         await update.message.reply_text(MISS_MESSAGE)
         return
 
-    answer = generate_answer(query, results)
+    answer = context.application.bot_data["generate_answer"](query, results)
     await update.message.reply_text(answer)
 
 start_handler = CommandHandler("start", start)
 help_handler = CommandHandler("help", help_command)
+corpus_handler = CommandHandler("corpus", corpus_command)
 message_handler = MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message)
 
-def main():
-    retriever = Retriever(index_path=INDEX_PATH, documents_path=DOCUMENTS_PATH)
+def build_application(retriever, token=TELEGRAM_TOKEN, base_url=None,
+                      answer_fn=generate_answer, concurrent_updates=False) -> Application:
+    builder = Application.builder().token(token)
+    if base_url:
+        builder = builder.base_url(base_url)  # e.g. a local Bot API server
+    if concurrent_updates:
+        builder = builder.concurrent_updates(concurrent_updates)
+    application = builder.build()
 
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
     application.bot_data["retriever"] = retriever  # Pass retriever to handlers
+    application.bot_data["generate_answer"] = answer_fn
 
     application.add_handler(start_handler)
     application.add_handler(help_handler)
+    application.add_handler(corpus_handler)
     application.add_handler(message_handler)
+    return application
+
+def main():
+    # Corpora are loaded on first query and kept under the memory budget
+    retriever = Retriever(corpus_manager=CorpusManager.from_config())
 
+    application = build_application(retriever)
     application.run_polling()
 
 if __name__ == "__main__":